@@ -1,17 +1,59 @@
 import pygame, sys
 from pygame.locals import *
 import pygame_textinput
-from math import sqrt
+from math import sqrt, exp, log, cos, sin, pi
 import random
 from time import time
 import csv
 import os
+from array import array
+from results import image_folder, read_sessions, item_difficulties
+from syllogism_logic import read_definitions, parse_shapes, check_labels
 
 SCREEN_SIZE = (800, 600)
 MAX_PARTICIPANTS = 20
 START_DELAY = 1.0  # s
+CONCLUSION_DISPLAY_TIME = 7.0  # s
 BACKGROUND_COLOR = (255, 255, 255)
 
+# Outlines of the stimulus shapes in pixels, relative to their center
+SQUARE = [(-48, -48), (48, -48), (48, 48), (-48, 48)]
+TRIANGLE = [(0, -46), (48, 46), (-48, 46)]
+CIRCLE = [(47 * cos(2 * pi * i / 48), 47 * sin(2 * pi * i / 48))
+          for i in range(48)]
+HEXAGON = [(0, -49), (48, -25), (48, 25), (0, 49), (-48, 25), (-48, -25)]
+DIAMOND = [(0, -47), (45, 0), (0, 47), (-45, 0)]
+PENTAGON = [(0, -56), (55, -15), (34, 49), (-34, 49), (-55, -15)]
+BAR = [(-20, -46), (20, -46), (20, 46), (-20, 46)]
+
+# Stimulus shapes by name: (color, outline)
+SHAPES = {'red-square': ((223, 32, 65), SQUARE),
+          'purple-square': ((163, 73, 163), SQUARE),
+          'orange-triangle': ((223, 128, 64), TRIANGLE),
+          'blue-triangle': ((63, 71, 204), TRIANGLE),
+          'blue-circle': ((65, 64, 192), CIRCLE),
+          'green-circle': ((35, 177, 77), CIRCLE),
+          'green-hexagon': ((32, 193, 64), HEXAGON),
+          'purple-diamond': ((160, 63, 192), DIAMOND),
+          'yellow-diamond': ((254, 242, 0), DIAMOND),
+          'red-pentagon': ((237, 27, 36), PENTAGON),
+          'yellow-bar': ((255, 255, 0), BAR),
+          'orange-bar': ((255, 127, 39), BAR),
+          'green-bar': ((0, 182, 32), BAR)}
+
+# Colors of highlighted caption lines
+CAPTION_COLORS = {'FALSE': (192, 0, 0), 'CORRECT': (0, 176, 80)}
+
+# Events fired by pygame timers
+START_CONCLUSIONS = USEREVENT
+HIDE_CONCLUSION = USEREVENT + 1
+
+# Adaptive selection of conclusions based on item difficulties estimated
+# from previous results. Stops once the ability estimate reaches the target
+# standard error after at least min_trials conclusions.
+ADAPTIVE_PARAMETERS = {'enabled': False, 'standard_error': 0.5,
+                       'min_trials': 10}
+
 
 class Participant:
     def __init__(self, participant_id):
@@ -31,90 +73,388 @@ class Participant:
         self.true_positives = 0.0
         self.true_negatives = 0.0
         self.false_negatives = 0.0
-        self.responses = []
         self.mean_reaction_time = 0.0
         self.std_reaction_time = 0.0
         self.false_alarm_rate = 0.0
         self.hit_rate = 0.0
 
+        # Selection of conclusions (Fixed or Adaptive)
+        self.mode = 'Fixed'
+
+        # Ability estimate and its standard error in adaptive mode
+        self.ability = None
+        self.ability_error = None
+
+        # Table of conclusion trials (TrialTable object)
+        # Will be set after the conclusions are loaded
+        self.trials = None
+
+        # Running mean and sum of squared deviations of reaction time
+        self.reaction_time_mean = 0.0
+        self.reaction_time_m2 = 0.0
+
         # Strings to display performance
         self.summary_strings = []
 
-    def compute_statistics(self, conclusions):
+    def record_response(self, trial):
         """
-        Update participant statistics after each trial.
+        Update participant statistics after each response, so that valid
+        results are available at any time of the experiment.
+        :param trial: int | row of the answered trial in the trial table
         """
 
-        # Get statistics from conclusions
-        reaction_times = []
-        
-        for conclusion in conclusions.items:
-
-             # Response of true
-            if conclusion.user_input == True: #user_input = True if event.key == K_d else False
-                self.responses.append(1)
-                #true positives
-                if conclusion.user_input == conclusion.label:
-                    self.true_positives += 1
-                    
-                else: 
-                    self.false_positives += 1
-            # Response of false
-            elif conclusion.user_input == False:
-                self.responses.append(0)
-                
-                if conclusion.user_input == conclusion.label:
-                     self.true_negatives += 1
-                     
-                else:
-                    self.false_negatives += 1
-                    
+        user_input = self.trials.response[trial] == 1
+        label = self.trials.label[trial]
+        reaction_time = self.trials.reaction_time[trial]
 
-            # Append reaction time
-            reaction_times.append(conclusion.reaction_time)
-            
-        #Compute hit and false alarm rate
-        self.hit_rate = self.true_positives / (self.true_positives + self.false_negatives)
-        self.false_alarm_rate = self.false_positives / (self.false_positives + self.true_negatives)
+        # Response of true
+        if user_input:
+            if label:
+                self.true_positives += 1
+            else:
+                self.false_positives += 1
+
+        # Response of false
+        else:
+            if label:
+                self.false_negatives += 1
+            else:
+                self.true_negatives += 1
+
+        # Compute hit and false alarm rate
+        if self.true_positives + self.false_negatives > 0:
+            self.hit_rate = self.true_positives / (self.true_positives +
+                                                   self.false_negatives)
+        if self.false_positives + self.true_negatives > 0:
+            self.false_alarm_rate = self.false_positives / (
+                self.false_positives + self.true_negatives)
+
+        # Update running mean and variance of reaction time (Welford)
+        number_of_responses = self.trials.number_of_responses
+        delta = reaction_time - self.reaction_time_mean
+        self.reaction_time_mean += delta / number_of_responses
+        self.reaction_time_m2 += delta * (reaction_time -
+                                          self.reaction_time_mean)
 
         # Compute reaction time statistics
-        self.mean_reaction_time = round(sum(reaction_times) /
-                                        len(reaction_times), 2)
-        self.std_reaction_time = round(sqrt(sum((xi -
-                                                 self.mean_reaction_time) ** 2
-                                                for xi in reaction_times) /
-                                            len(reaction_times)), 2)
+        self.mean_reaction_time = round(self.reaction_time_mean, 2)
+        self.std_reaction_time = round(sqrt(self.reaction_time_m2 /
+                                            number_of_responses), 2)
 
         # Set summary strings
-        summary_string_1 = 'You answered ' + str(self.true_positives + self.true_negatives) + ' of ' + \
-                              str(len(conclusions.items)) + ' conclusions ' \
-                                                            'correctly'
+        summary_string_1 = 'You answered ' + str(self.true_positives +
+                                                 self.true_negatives) + \
+                           ' of ' + str(number_of_responses) + \
+                           ' conclusions correctly'
         summary_string_2 = 'with an average reaction time of ' \
-                                + str(self.mean_reaction_time) + 's.'
+                           + str(self.mean_reaction_time) + 's.'
         self.summary_strings = [summary_string_1, summary_string_2]
 
-    def write_csv(self, conclusions):
+    def write_csv(self, completed):
         """
-        Write participant's results to CSV file at the end of the experiment.
+        Write participant's results to CSV file. Results of an aborted
+        experiment cover all responses given so far. A rate is left empty if
+        no conclusion of its label was shown, the ability is left empty if
+        conclusions were not selected adaptively.
+        :param completed: bool | False if the experiment was aborted
         """
-        correctness = [1 if conclusion.label else 0 for conclusion in conclusions.items]
+        hit_rate = self.hit_rate \
+            if self.true_positives + self.false_negatives > 0 else ''
+        false_alarm_rate = self.false_alarm_rate \
+            if self.false_positives + self.true_negatives > 0 else ''
+        responses = self.trials.responses() if self.trials is not None \
+            else []
+        stimulus_ids = self.trials.stimulus_ids() \
+            if self.trials is not None else []
+        reaction_times = self.trials.reaction_times() \
+            if self.trials is not None else []
+        ability = round(self.ability, 3) if self.ability is not None \
+            else ''
+        ability_error = round(self.ability_error, 3) \
+            if self.ability_error is not None else ''
         with open("SolvingSyllogisms.csv", "a") as database:
             # Write results to csv file
-            # Format: ID, number of attempts, mean, std
+            # Format: ID, rates, counts, mean, std, responses, stimulus IDs,
+            # reaction times, mode, completed, ability, standard error
             writer = csv.writer(database)
-            writer.writerow([self.participant_id, self.hit_rate, self.false_alarm_rate, self.true_positives, self.false_negatives, self.false_positives, self.true_negatives, self.mean_reaction_time, self.std_reaction_time, self.responses])
+            writer.writerow([self.participant_id, hit_rate, false_alarm_rate, self.true_positives, self.false_negatives, self.false_positives, self.true_negatives, self.mean_reaction_time, self.std_reaction_time, responses, stimulus_ids, reaction_times, self.mode, completed, ability, ability_error])
 
 
-class Sequence:
-    class Conclusion:
-        def __init__(self, image, label):
-            self.image = image
-            self.label = label
-            self.user_input = None
-            self.reaction_time = None
-            self.display_time = 0
+class StimulusRenderer:
+    def __init__(self, size, spacing=147, font_size=40):
+        """
+        StimulusRenderer class to draw premises and conclusions as rows of
+        shapes instead of loading pre-made images. Rendered surfaces are
+        cached by their definition.
+        :param size: tuple (int, int) | (width, height) of the surfaces
+        :param spacing: int | distance between the centers of two shapes
+        :param font_size: int | font size of captions in pixels
+        """
+
+        self.size = size
+        self.spacing = spacing
+        self.font = pygame.font.Font(None, font_size)
+        self.font_small = pygame.font.Font(None, font_size * 3 // 4)
+
+        # Rendered surfaces by definition
+        self.cache = {}
+
+    @staticmethod
+    def parse(definition):
+        """
+        Split definition into shape names, crossed out shapes, captions and
+        insets, e.g. 'red-square! blue-circle | Example | FALSE'. A '!'
+        after a shape name crosses the shape out. A caption in brackets,
+        e.g. '[Premise 1: blue-circle purple-square]', is an inset.
+        :return: tuple (list of names, list of bool, list of captions,
+                 list of insets (title, list of names))
+        """
+
+        parts = definition.split('|')
+        names = parse_shapes(definition)
+        crossed = [token.endswith('!') for token in parts[0].split()]
+
+        captions = []
+        insets = []
+        for part in parts[1:]:
+            part = part.strip()
+            if part.startswith('[') and part.endswith(']'):
+                title, _, shapes = part[1:-1].partition(':')
+                insets.append((title.strip(), shapes.split()))
+            else:
+                captions.append(part)
+
+        return names, crossed, captions, insets
+
+    def render(self, definition):
+        """
+        Return surface showing the definition, rendering it if not yet
+        cached.
+        """
+
+        if definition in self.cache:
+            return self.cache[definition]
+
+        names, crossed, captions, insets = self.parse(definition)
+        surface = pygame.Surface(self.size)
+        surface.fill(BACKGROUND_COLOR)
+
+        # Draw shapes in a centered row, moved right of the insets
+        y = self.size[1] / 2.0
+        spacing = self.spacing
+        center_x = self.size[0] / 2.0
+        if insets:
+            spacing = self.spacing * 5 // 7
+            center_x += 70
+        first_x = center_x - (len(names) - 1) * spacing / 2.0
+        for i, name in enumerate(names):
+            x = first_x + i * spacing
+            color, outline = SHAPES[name]
+            points = [(x + dx, y + dy) for dx, dy in outline]
+            pygame.draw.polygon(surface, color, points)
+            pygame.draw.polygon(surface, (0, 0, 0), points, 2)
+
+            # Draw cross below crossed out shapes
+            if crossed[i]:
+                pygame.draw.line(surface, (0, 0, 0), (x - 20, y + 70),
+                                 (x + 20, y + 130), 12)
+                pygame.draw.line(surface, (0, 0, 0), (x + 20, y + 70),
+                                 (x - 20, y + 130), 12)
+
+        # Draw captions above the shapes
+        for i, caption in enumerate(captions):
+            color = CAPTION_COLORS.get(caption, (0, 0, 0))
+            text_surface = self.font.render(caption, True, color)
+            text_rectangle = text_surface.get_rect()
+            text_rectangle.center = (self.size[0] / 2.0, 40 + i * 35)
+            surface.blit(text_surface, text_rectangle)
+
+        # Draw insets as boxes with a title and small shapes left of the
+        # row
+        for i, (title, inset_names) in enumerate(insets):
+            box = pygame.Rect(128, 83 + i * 140, 121, 128)
+            pygame.draw.rect(surface, (0, 0, 0), box, 1)
+            text_surface = self.font_small.render(title, True, (0, 0, 0))
+            text_rectangle = text_surface.get_rect()
+            text_rectangle.center = (box.centerx, box.top + 22)
+            surface.blit(text_surface, text_rectangle)
+
+            first_x = box.centerx - (len(inset_names) - 1) * 43 / 2.0
+            for j, name in enumerate(inset_names):
+                color, outline = SHAPES[name]
+                points = [(first_x + j * 43 + 0.28 * dx,
+                           box.top + 77 + 0.28 * dy) for dx, dy in outline]
+                pygame.draw.polygon(surface, color, points)
+                pygame.draw.polygon(surface, (0, 0, 0), points, 1)
+
+        self.cache[definition] = surface
+        return surface
+
+    def render_all(self, definitions):
+        """
+        Render all definitions in advance.
+        """
+
+        return [self.render(definition) for definition in definitions]
+
+
+class TrialTable:
+    def __init__(self, labels):
+        """
+        TrialTable class to store all trials of a conclusion sequence in
+        preallocated typed arrays, one array per attribute. Each row is a
+        trial in the order of presentation.
+        :param labels: list of bool | label of each conclusion
+        """
+
+        self.size = len(labels)
+
+        # Displayed conclusion and its label
+        self.stimulus_id = array('i', range(self.size))
+        self.label = array('b', labels)
+
+        # Response (1: true, 0: false, -1: no response yet)
+        self.response = array('b', [-1]) * self.size
+
+        # Onset and reaction time in s
+        self.onset = array('d', [0.0]) * self.size
+        self.reaction_time = array('d', [0.0]) * self.size
+
+        # Whether the conclusion is still shown
+        self.visible = array('b', [1]) * self.size
+
+        # Number of answered trials
+        self.number_of_responses = 0
+
+    def record(self, trial, user_input, reaction_time):
+        """
+        Store response and reaction time of a trial.
+        """
+
+        self.response[trial] = 1 if user_input else 0
+        self.reaction_time[trial] = reaction_time
+        self.number_of_responses += 1
+
+    def hide(self, trial):
+        self.visible[trial] = 0
+
+    def responses(self):
+        """
+        Return list of all responses given so far.
+        """
+
+        return self.response[:self.number_of_responses].tolist()
+
+    def stimulus_ids(self):
+        """
+        Return list of the stimulus IDs of all answered trials.
+        """
+
+        return self.stimulus_id[:self.number_of_responses].tolist()
+
+    def reaction_times(self):
+        """
+        Return list of the reaction times of all answered trials in s.
+        """
+
+        return [round(reaction_time, 3) for reaction_time in
+                self.reaction_time[:self.number_of_responses]]
+
+
+class AdaptiveSelector:
+    def __init__(self, difficulties, labels, standard_error, min_trials):
+        """
+        AdaptiveSelector class to choose the next conclusion based on the
+        responses so far. The ability of the participant is estimated on a
+        grid with a standard normal prior (Rasch model), and the unused
+        conclusion whose difficulty is closest to the estimate is chosen.
+        True and false conclusions are shown in equal numbers.
+        :param difficulties: list of float | difficulty of each conclusion
+        :param labels: list of bool | label of each conclusion
+        :param standard_error: float | target standard error of the ability
+        :param min_trials: int | minimum number of conclusions
+        """
 
-    def __init__(self, sequence_type, image_folder_id):
+        self.difficulties = difficulties
+        self.labels = labels
+        self.standard_error = standard_error
+        self.min_trials = min_trials
+
+        # Ability grid and log posterior of each grid point
+        self.abilities = [-4.0 + 0.1 * i for i in range(81)]
+        self.log_posterior = [-ability ** 2 / 2.0
+                              for ability in self.abilities]
+
+        # Conclusions shown so far and their number per label
+        self.used = set()
+        self.shown = {True: 0, False: 0}
+
+        # Current estimate and standard error of the ability
+        self.ability = 0.0
+        self.ability_error = 1.0
+
+    def next_item(self):
+        """
+        Return the most informative conclusion not shown yet, taken from
+        the label shown less often so far.
+        """
+
+        unused = [stimulus_id for stimulus_id in range(len(self.difficulties))
+                  if stimulus_id not in self.used]
+
+        # Keep labels balanced while conclusions of both labels are left
+        if self.shown[True] != self.shown[False]:
+            label = self.shown[True] < self.shown[False]
+            balanced = [i for i in unused if bool(self.labels[i]) == label]
+            unused = balanced or unused
+
+        stimulus_id = min(unused, key=lambda i: abs(self.difficulties[i] -
+                                                    self.ability))
+        self.used.add(stimulus_id)
+        self.shown[bool(self.labels[stimulus_id])] += 1
+
+        return stimulus_id
+
+    def update(self, stimulus_id, correct):
+        """
+        Update ability estimate after a response.
+        :param stimulus_id: int | answered conclusion
+        :param correct: bool | True if answered correctly
+        """
+
+        difficulty = self.difficulties[stimulus_id]
+        for i, ability in enumerate(self.abilities):
+            p_correct = 1.0 / (1.0 + exp(difficulty - ability))
+            self.log_posterior[i] += log(p_correct if correct
+                                         else 1.0 - p_correct)
+
+        # Posterior mean and standard deviation
+        highest = max(self.log_posterior)
+        weights = [exp(value - highest) for value in self.log_posterior]
+        total = sum(weights)
+        self.ability = sum(w * a for w, a in zip(weights,
+                                                 self.abilities)) / total
+        self.ability_error = sqrt(sum(w * (a - self.ability) ** 2
+                                      for w, a in zip(weights,
+                                                      self.abilities)) /
+                                  total)
+
+    def finished(self):
+        """
+        Check whether the ability is measured precisely enough with equally
+        many true and false conclusions, or all conclusions were shown.
+        """
+
+        if len(self.used) == len(self.difficulties):
+            return True
+
+        return len(self.used) >= self.min_trials and \
+            self.shown[True] == self.shown[False] and \
+            self.ability_error <= self.standard_error
+
+
+class Sequence:
+    def __init__(self, sequence_type, image_folder_id, renderer):
 
         assert sequence_type in ['Premise', 'Conclusion', 'Test']
         self.type = sequence_type
@@ -133,76 +473,87 @@ class Sequence:
         else:
             naming_key = ['T']
 
-        # Construct list of items
-        self.items = self.load_images(root, naming_key)
+        # Construct list of items rendered from text definitions
+        if not os.path.isfile(root + '.txt'):
+            raise IOError('Definition file ' + root + '.txt not found.')
+        self.items, labels = self.load_texts(root + '.txt', naming_key,
+                                             renderer)
+
+        # Labels of the items by stimulus ID
+        self.labels = labels
+
+        # Table of trials, only used for conclusions
+        self.trials = TrialTable(labels) if self.type == 'Conclusion' \
+            else None
 
         # Pointer to the currently displayed item
         self.item_pointer = 0
 
+    def select(self, trial, stimulus_id):
+        """
+        Set the conclusion shown in a trial.
+        """
+
+        self.trials.stimulus_id[trial] = stimulus_id
+        self.trials.label[trial] = self.labels[stimulus_id]
+
     def current_display_time(self):
         """
         Return display time of current item
         """
 
-        return self.items[self.item_pointer].display_time
+        return self.trials.onset[self.item_pointer]
 
     def show(self, screen):
 
-        current_item = self.items[self.item_pointer]
         if self.type in ['Premise', 'Test']:
-            screen.blit(current_item, (0, 50))
+            screen.blit(self.items[self.item_pointer], (0, 50))
         else:
-            screen.blit(current_item.image, (0, 50))
+            stimulus_id = self.trials.stimulus_id[self.item_pointer]
+            screen.blit(self.items[stimulus_id], (0, 50))
             if self.current_display_time() == 0:
-                self.items[self.item_pointer].display_time = time()
+                self.trials.onset[self.item_pointer] = time()
 
-    def load_images(self, root, naming_key):
+    def load_texts(self, filename, naming_key, renderer):
         """
-        Load images from directory.
+        Load items from definition file. Each line holds the item name,
+        following the naming convention of the image files, and its shapes,
+        e.g. '12F: red-square green-hexagon purple-diamond orange-triangle'
+        :return: tuple (list of images, list of labels)
         """
 
-        # Create container for all image objects
-        items = []
-        
-        # Loop over all files in the root directory
-        # os.listdir(root) returns a list of all file names in the directory
-        for filename in sorted (os.listdir(root)):
-
-            # Get complete path to image
-            img_path = os.path.join(root, filename)
-
-            # Check that file is of correct type and follows naming convention
-            try:
-                # filename has to start with P (Premise)
-                # and file has to be a jpg-file
-                key_digits = len(naming_key[0])
-                assert filename[2:2+key_digits] in naming_key
-            except AssertionError:
-                print('Incorrect file type or naming convention detected in '
-                      'filename' + str(img_path) + ". Skip file...")
+        # Conclusions whose label does not follow from the premises
+        mislabeled = []
+        if self.type == 'Conclusion':
+            mislabeled = check_labels(os.path.dirname(filename))
+
+        definitions = []
+        for name, text in read_definitions(filename):
+
+            # Check that name follows naming convention and that all shapes
+            # are known
+            names, _, _, insets = renderer.parse(text)
+            shapes = names + [shape for _, inset_names in insets
+                              for shape in inset_names]
+            if name[2:3] not in naming_key or not names or \
+                    any(shape not in SHAPES for shape in shapes):
+                print('Incorrect naming convention or unknown shape '
+                      'detected in item ' + name + " of " + filename +
+                      ". Skip item...")
                 continue
 
-            # If ConclusionSequence, create Conclusion object
-            if self.type == 'Conclusion':
-
-                # Load image
-                image = pygame.image.load(img_path)
-
-                # Construct label based on naming convention
-                label = True if filename[2] == 'T' else False
-
-                item = self.Conclusion(image, label)
-
-            else:
+            if name in mislabeled:
+                print('Label of conclusion ' + name + ' in ' + filename +
+                      ' does not follow from the premises. Skip item...')
+                continue
 
-                # Load image
-                item = pygame.image.load(img_path)
+            definitions.append((name, text))
 
-            # Append object to list of objects
-            
-            items.append(item)
+        # Render all items in advance
+        images = renderer.render_all([text for _, text in definitions])
+        labels = [name[2] == 'T' for name, _ in definitions]
 
-        return items
+        return images, labels
 
 
 class Application:
@@ -216,14 +567,17 @@ class Application:
     font_small = pygame.font.Font(None, 40)
 
     def __init__(self, screen_size, start_delay,
-                 max_participants):
+                 max_participants, conclusion_display_time,
+                 adaptive_parameters):
         """
     Constructor for application class. This class instantiates the GUI
     and handles all interaction with the participant.
     :param screen_size: tuple (int, int) | (width, height)
     :param box_parameters: dict | box parameters (number, size, dist., ...)
-    :param start_delay: float | time before first corsi box is shown in s
+    :param start_delay: float | time before first conclusion is shown in s
     :param max_participants: int | maximum number of participants
+    :param conclusion_display_time: float | time a conclusion is shown in s
+    :param adaptive_parameters: dict | adaptive selection (enabled, ...)
     """
 
         # Initialize PyGame
@@ -243,6 +597,9 @@ class Application:
         # Declare interface for text input
         self.text_input = pygame_textinput.TextInput()
 
+        # Declare renderer for stimuli defined as shapes
+        self.renderer = StimulusRenderer((self.screen_size[0], 400))
+
         # Set initial state of the application
         self.state = 'Participant_ID'
 
@@ -272,8 +629,18 @@ class Application:
         # Set maximum number of participants
         self.max_participants = max_participants
 
-        # Set delay time between instruction
-        self.start_delay = int(start_delay)
+        # Set delay time between last premise and first conclusion
+        self.start_delay = start_delay
+
+        # Set time a conclusion is shown before it is hidden
+        self.conclusion_display_time = conclusion_display_time
+
+        # Set parameters of adaptive selection of conclusions
+        self.adaptive_parameters = adaptive_parameters
+
+        # Adaptive selector (AdaptiveSelector object)
+        # Will be created after participant ID is known if enabled
+        self.selector = None
 
         # Load instruction image
         self.instruction_image = pygame.image.load(
@@ -310,10 +677,22 @@ class Application:
             # Pressing ESC or clicking X
             if event.type == QUIT or (event.type == KEYDOWN and
                                       event.key == K_ESCAPE):
-                self.participant.write_csv(self.conclusions)
+                # Write results if at least one conclusion was answered
+                if self.participant is not None and \
+                        self.participant.trials is not None and \
+                        self.participant.trials.number_of_responses > 0:
+                    self.participant.write_csv(self.state == 'End')
                 pygame.quit()
                 sys.exit()
 
+            # Start conclusions after start delay
+            if event.type == START_CONCLUSIONS:
+                self.state = 'Conclusion'
+
+            # Hide conclusion after its display time
+            if event.type == HIDE_CONCLUSION:
+                self.conclusions.trials.hide(event.trial)
+
             if self.state == 'Participant_ID':
                 self.handle_id_input(event)
 
@@ -363,15 +742,28 @@ class Application:
                 self.trial_type = self.get_trial_type(participant_id)
                 
                 # Get image folder determined by even or odd participant id
-                if ((participant_id % 2) == 0 and self.trial_type == "Pre") or ((participant_id % 2) == 1 and self.trial_type == "Post"):
-                    image_folder_id = "Folder1"
-                else: 
-                    image_folder_id = "Folder2"
-                            
-                self.premises = Sequence('Premise', image_folder_id)
-                self.conclusions = Sequence('Conclusion', image_folder_id)
+                image_folder_id = image_folder(participant_id,
+                                               self.trial_type)
+
+                self.premises = Sequence('Premise', image_folder_id,
+                                         self.renderer)
+                self.conclusions = Sequence('Conclusion', image_folder_id,
+                                            self.renderer)
+                self.participant.trials = self.conclusions.trials
+
+                # Choose first conclusion based on previous results
+                if self.adaptive_parameters['enabled']:
+                    difficulties = item_difficulties(
+                        read_sessions(), image_folder_id,
+                        self.conclusions.labels)
+                    self.selector = AdaptiveSelector(
+                        difficulties, self.conclusions.labels,
+                        self.adaptive_parameters['standard_error'],
+                        self.adaptive_parameters['min_trials'])
+                    self.conclusions.select(0, self.selector.next_item())
+                    self.participant.mode = 'Adaptive'
                 if self.trial_type == 'Pre':
-                    self.test = Sequence('Test', None)
+                    self.test = Sequence('Test', None, self.renderer)
 
                 if self.trial_type == 'Pre':
                     # Set application state to "Instructions"
@@ -413,8 +805,25 @@ class Application:
         if self.premises.item_pointer == len(self.premises.items):
             if event.type == KEYDOWN and event.key == K_SPACE:
 
-                # Set state
-                self.state = "Conclusion"
+                # Set state and show first conclusion after start delay
+                self.state = "Delay"
+                self.schedule(pygame.event.Event(START_CONCLUSIONS),
+                              self.start_delay)
+
+    @staticmethod
+    def schedule(event, delay):
+        """
+        Post event once after a delay. A timer of 0 ms would never fire,
+        so shorter delays post the event right away.
+        :param event: PyGame event object
+        :param delay: float | delay in s
+        """
+
+        milliseconds = int(delay * 1000)
+        if milliseconds > 0:
+            pygame.time.set_timer(event, milliseconds, 1)
+        else:
+            pygame.event.post(event)
 
     def handle_conclusion_input(self, event):
         """
@@ -427,30 +836,42 @@ class Application:
             # Get user input
             user_input = True if event.key == K_d else False
 
-            # Set user input attribute
-            self.conclusions.items[
-                self.conclusions.item_pointer].user_input = user_input
-
             # Get current time and compute reaction time
+            trial = self.conclusions.item_pointer
             end_time = time()
-            reaction_time = end_time - self.conclusions.items[
-                self.conclusions.item_pointer].display_time
+            reaction_time = end_time - self.conclusions.trials.onset[trial]
+
+            # Cancel hiding of the answered conclusion
+            pygame.time.set_timer(HIDE_CONCLUSION, 0)
+
+            # Store user input and reaction time
+            self.conclusions.trials.record(trial, user_input, reaction_time)
 
-            # Set reaction time attribute
-            self.conclusions.items[
-                self.conclusions.item_pointer].reaction_time = reaction_time
+            # Update performance statistics
+            self.participant.record_response(trial)
 
             # Increment item pointer
             self.conclusions.item_pointer += 1
 
             # End experiment with user input to last conclusion
-            if self.conclusions.item_pointer == (len(self.conclusions.items)):
+            if self.selector is None:
+                if self.conclusions.item_pointer == \
+                        len(self.conclusions.items):
+                    self.state = 'End'
 
-                # Set state
-                self.state = 'End'
-
-                # Compute performance statistics
-                self.participant.compute_statistics(self.conclusions)
+            # In adaptive mode, end experiment once the ability is measured
+            # precisely enough or choose the next conclusion
+            else:
+                correct = user_input == self.conclusions.trials.label[trial]
+                self.selector.update(
+                    self.conclusions.trials.stimulus_id[trial], correct)
+                self.participant.ability = self.selector.ability
+                self.participant.ability_error = self.selector.ability_error
+                if self.selector.finished():
+                    self.state = 'End'
+                else:
+                    self.conclusions.select(self.conclusions.item_pointer,
+                                            self.selector.next_item())
 
     def update_screen(self):
         """
@@ -515,14 +936,26 @@ class Application:
             self.draw_text("Press Spacebar to continue", self.font_small,
                            self.BLACK, BACKGROUND_COLOR, SCREEN_SIZE[1] * .8)
 
+        elif self.state == 'Delay':
+
+            # Show fixation cross until first conclusion
+            self.draw_text("+", self.font, self.BLACK, BACKGROUND_COLOR,
+                           SCREEN_SIZE[1] * .5)
+
         elif self.state == 'Conclusion':
 
             # Get conclusion ID
             conclusion_id = self.conclusions.item_pointer + 1
 
-            # Show image for 7 seconds
-            last_display_time = self.conclusions.current_display_time()
-            if (time() - last_display_time) < 7.0 or last_display_time == 0:
+            # Schedule hiding of the image when it is first shown
+            trial = self.conclusions.item_pointer
+            if self.conclusions.current_display_time() == 0:
+                self.schedule(pygame.event.Event(HIDE_CONCLUSION,
+                                                 trial=trial),
+                              self.conclusion_display_time)
+
+            # Show image until its display time has passed
+            if self.conclusions.trials.visible[trial]:
                 self.conclusions.show(self.screen)
 
             # Show instructions
@@ -593,4 +1026,5 @@ class Application:
 
 
 if __name__ == '__main__':
-    Application(SCREEN_SIZE, START_DELAY, MAX_PARTICIPANTS).start()
+    Application(SCREEN_SIZE, START_DELAY, MAX_PARTICIPANTS,
+                CONCLUSION_DISPLAY_TIME, ADAPTIVE_PARAMETERS).start()
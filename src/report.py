@@ -0,0 +1,334 @@
+"""
+Build per-participant and group reports from the results written by
+Syllogisms.py.
+
+Usage: python report.py [results file] [output directory]
+"""
+
+import hashlib
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+from results import RESULTS_FILE, read_sessions
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except ImportError:
+    plt = None
+
+REPORT_DIR = 'Report'
+MANIFEST_FILE = 'manifest.json'
+
+
+def session_hash(participant_sessions):
+    """
+    Return a hash of a participant's sessions to detect changed rows.
+    """
+
+    data = json.dumps(participant_sessions, sort_keys=True)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def summarize(participant_id, participant_sessions):
+    """
+    Summarize Pre and Post performance of a single participant. Changes
+    of rates and reaction time are only computed if both sessions were
+    completed and showed all conclusions, the change of ability if both
+    were completed in adaptive mode.
+    :return: dict with the sessions and Pre to Post changes
+    """
+
+    summary = {'participant_id': participant_id,
+               'sessions': participant_sessions}
+
+    # Compare only completed sessions that showed all conclusions
+    if len(participant_sessions) >= 2 and \
+            all(compared(s) for s in participant_sessions[:2]):
+        pre, post = participant_sessions[0], participant_sessions[1]
+        for key in ['hit_rate', 'false_alarm_rate', 'mean_reaction_time']:
+            summary[key + '_change'] = post[key] - pre[key] \
+                if post[key] is not None and pre[key] is not None else None
+
+    # Adaptive sessions are compared by their ability estimate
+    if len(participant_sessions) >= 2 and \
+            all(s['completed'] and s['mode'] == 'Adaptive'
+                for s in participant_sessions[:2]):
+        pre, post = participant_sessions[0], participant_sessions[1]
+        summary['ability_change'] = post['ability'] - pre['ability']
+
+    return summary
+
+
+def build_participant_report(job):
+    """
+    Write HTML page and chart of a single participant. Runs in a worker
+    process of the pool.
+    :param job: tuple (participant ID, list of sessions, output directory)
+    :return: summary dict of the participant
+    """
+
+    participant_id, participant_sessions, output_dir = job
+    summary = summarize(participant_id, participant_sessions)
+
+    chart_name = 'participant_' + str(participant_id) + '.png'
+    if plt is not None:
+        labels = [s['trial_type'] for s in participant_sessions]
+        figure, (rate_axes, rt_axes) = plt.subplots(1, 2, figsize=(8, 3))
+
+        positions = range(len(labels))
+        rate_axes.bar([p - 0.2 for p in positions],
+                      [number(s['hit_rate']) for s in participant_sessions],
+                      width=0.4, label='Hit rate')
+        rate_axes.bar([p + 0.2 for p in positions],
+                      [number(s['false_alarm_rate'])
+                       for s in participant_sessions],
+                      width=0.4, label='False alarm rate')
+        rate_axes.set_xticks(list(positions))
+        rate_axes.set_xticklabels(labels)
+        rate_axes.set_ylim(0, 1)
+        rate_axes.legend()
+
+        # Distribution of reaction times if stored per trial
+        if all(s['reaction_times'] for s in participant_sessions):
+            rt_axes.boxplot([s['reaction_times']
+                             for s in participant_sessions])
+            rt_axes.set_xticks([p + 1 for p in positions])
+            rt_axes.set_xticklabels(labels)
+        else:
+            rt_axes.bar(labels,
+                        [s['mean_reaction_time']
+                         for s in participant_sessions],
+                        yerr=[s['std_reaction_time']
+                              for s in participant_sessions])
+        rt_axes.set_ylabel('Reaction time (s)')
+
+        figure.tight_layout()
+        figure.savefig(os.path.join(output_dir, chart_name))
+        plt.close(figure)
+
+    rows = ''
+    for session in participant_sessions:
+        rows += '<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td>' \
+                '<td>%s</td><td>%s</td><td>%.2f</td><td>%.2f</td>' \
+                '<td>%s</td></tr>\n' % (
+                    session['trial_type'], session['folder'],
+                    session['mode'],
+                    'Yes' if session['completed'] else 'No',
+                    text(session['hit_rate']),
+                    text(session['false_alarm_rate']),
+                    session['mean_reaction_time'],
+                    session['std_reaction_time'],
+                    '%.2f (SE %.2f)' % (session['ability'],
+                                        session['ability_error'])
+                    if session['ability'] is not None else '-')
+
+    with open(os.path.join(output_dir, 'participant_' + str(participant_id) +
+                           '.html'), 'w') as page:
+        page.write('<html><body>\n<h1>Participant %d</h1>\n' % participant_id)
+        page.write('<table border="1">\n<tr><th>Trial</th><th>Folder</th>'
+                   '<th>Mode</th><th>Completed</th><th>Hit rate</th><th>False alarm rate</th>'
+                   '<th>Mean RT (s)</th><th>Std RT (s)</th><th>Ability</th>'
+                   '</tr>\n')
+        page.write(rows + '</table>\n')
+        if 'hit_rate_change' in summary:
+            page.write('<p>Change from Pre to Post: hit rate %s, false '
+                       'alarm rate %s, mean RT %s s</p>\n' % (
+                           text(summary['hit_rate_change'], '%+.2f'),
+                           text(summary['false_alarm_rate_change'], '%+.2f'),
+                           text(summary['mean_reaction_time_change'],
+                                '%+.2f')))
+        if 'ability_change' in summary:
+            page.write('<p>Change of ability from Pre to Post: %+.2f</p>\n'
+                       % summary['ability_change'])
+        if plt is not None:
+            page.write('<img src="%s">\n' % chart_name)
+        page.write('<p><a href="index.html">Back</a></p>\n</body></html>\n')
+
+    return summary
+
+
+def compared(session):
+    return session['completed'] and session['mode'] == 'Fixed'
+
+
+def mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+def number(value):
+    return float('nan') if value is None else value
+
+
+def text(value, form='%.2f'):
+    return '-' if value is None else form % value
+
+
+def build_index(summaries, output_dir):
+    """
+    Write group summary and HTML index linking all participant pages.
+    :param summaries: list of participant summary dicts
+    :param output_dir: str | output directory
+    """
+
+    complete = [s for s in summaries if 'hit_rate_change' in s]
+
+    # Group comparisons use only completed sessions that showed all
+    # conclusions
+    sessions = [session for s in summaries for session in s['sessions']
+                if compared(session)]
+    aborted = sum(1 for s in summaries for session in s['sessions']
+                  if not session['completed'])
+
+    # Pre to Post changes over participants with both trials
+    changes = ''
+    for key, name in [('hit_rate_change', 'Hit rate'),
+                      ('false_alarm_rate_change', 'False alarm rate'),
+                      ('mean_reaction_time_change', 'Mean RT (s)')]:
+        changes += '<tr><td>%s</td><td>%s</td></tr>\n' % (
+            name, text(mean([s[key] for s in complete]), '%+.2f'))
+
+    # Pre to Post change of ability over participants with both trials in
+    # adaptive mode
+    adaptive = [s for s in summaries if 'ability_change' in s]
+    ability_change = text(mean([s['ability_change'] for s in adaptive]),
+                          '%+.2f')
+
+    # Counterbalancing: performance per image folder and trial
+    folders = ''
+    for folder in ['Folder1', 'Folder2']:
+        for trial_type in ['Pre', 'Post']:
+            selection = [s for s in sessions if s['folder'] == folder and
+                         s['trial_type'] == trial_type]
+            folders += '<tr><td>%s</td><td>%s</td><td>%d</td><td>%s</td>' \
+                       '<td>%s</td><td>%s</td></tr>\n' % (
+                           folder, trial_type, len(selection),
+                           text(mean([s['hit_rate'] for s in selection])),
+                           text(mean([s['false_alarm_rate']
+                                      for s in selection])),
+                           text(mean([s['mean_reaction_time']
+                                      for s in selection])))
+
+    if plt is not None:
+        figure, axes = plt.subplots(figsize=(5, 3))
+
+        # Use reaction times of single trials if stored, otherwise the mean
+        # reaction time of each session
+        per_trial = any(s['reaction_times'] for s in sessions)
+        for trial_type in ['Pre', 'Post']:
+            selection = [s for s in sessions
+                         if s['trial_type'] == trial_type]
+            if per_trial:
+                values = [reaction_time for s in selection
+                          for reaction_time in s['reaction_times']]
+            else:
+                values = [s['mean_reaction_time'] for s in selection]
+            axes.hist(values, alpha=0.5, label=trial_type)
+        axes.set_xlabel('Reaction time (s)' if per_trial
+                        else 'Mean reaction time (s)')
+        axes.set_ylabel('Trials' if per_trial else 'Participants')
+        axes.legend()
+        figure.tight_layout()
+        figure.savefig(os.path.join(output_dir, 'reaction_times.png'))
+        plt.close(figure)
+
+    links = ''
+    for summary in sorted(summaries, key=lambda s: s['participant_id']):
+        links += '<li><a href="participant_%d.html">Participant %d</a> ' \
+                 '(%s)</li>\n' % (summary['participant_id'],
+                                  summary['participant_id'],
+                                  ', '.join(s['trial_type']
+                                            for s in summary['sessions']))
+
+    with open(os.path.join(output_dir, 'index.html'), 'w') as page:
+        page.write('<html><body>\n<h1>Solving Syllogisms</h1>\n')
+        if aborted:
+            page.write('<p>%d aborted sessions are not included in the '
+                       'group comparisons.</p>\n' % aborted)
+        page.write('<h2>Change from Pre to Post (%d participants)</h2>\n'
+                   % len(complete))
+        page.write('<table border="1">\n' + changes + '</table>\n')
+        if adaptive:
+            page.write('<h2>Change of ability from Pre to Post, adaptive '
+                       '(%d participants)</h2>\n<p>%s</p>\n'
+                       % (len(adaptive), ability_change))
+        page.write('<h2>Image folders</h2>\n<table border="1">\n<tr>'
+                   '<th>Folder</th><th>Trial</th><th>N</th><th>Hit rate</th>'
+                   '<th>False alarm rate</th><th>Mean RT (s)</th></tr>\n')
+        page.write(folders + '</table>\n')
+        if plt is not None:
+            page.write('<h2>Reaction times</h2>\n'
+                       '<img src="reaction_times.png">\n')
+        page.write('<h2>Participants</h2>\n<ul>\n' + links + '</ul>\n')
+        page.write('</body></html>\n')
+
+
+def report_files(participant_id, output_dir):
+    """
+    Return paths of all files written for a participant.
+    """
+
+    name = os.path.join(output_dir, 'participant_' + str(participant_id))
+    return [name + '.html'] + ([name + '.png'] if plt is not None else [])
+
+
+def build_report(filename=RESULTS_FILE, output_dir=REPORT_DIR):
+    """
+    Build reports of all participants in parallel. Only participants whose
+    rows changed since the last build or whose files are missing are
+    processed again.
+    :param filename: str | path to results file
+    :param output_dir: str | output directory
+    """
+
+    if plt is None:
+        print('matplotlib is not installed. Charts are skipped and only '
+              'HTML pages are written.')
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    # Load hashes and summaries of the last build
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    manifest = {}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    sessions = read_sessions(filename)
+    summaries = []
+    jobs = []
+    hashes = {}
+    for participant_id, participant_sessions in sessions.items():
+        key = str(participant_id)
+        hashes[key] = session_hash(participant_sessions)
+        if key in manifest and manifest[key]['hash'] == hashes[key] and \
+                all(os.path.isfile(path) for path in
+                    report_files(participant_id, output_dir)):
+            summaries.append(manifest[key]['summary'])
+        else:
+            jobs.append((participant_id, participant_sessions, output_dir))
+
+    if jobs:
+        with Pool() as pool:
+            summaries.extend(pool.map(build_participant_report, jobs))
+
+    build_index(summaries, output_dir)
+
+    # Store hashes and summaries for the next build
+    manifest = {str(s['participant_id']): {
+        'hash': hashes[str(s['participant_id'])], 'summary': s}
+        for s in summaries}
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    print('Processed ' + str(len(jobs)) + ' of ' + str(len(sessions)) +
+          ' participants. Report written to ' + output_dir)
+
+
+if __name__ == '__main__':
+    build_report(*sys.argv[1:3])
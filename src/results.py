@@ -0,0 +1,120 @@
+"""
+Read the results written by Syllogisms.py. Shared by the experiment and the
+report, so it must not import any plotting library.
+"""
+
+import ast
+import csv
+import os
+from math import log
+
+RESULTS_FILE = 'SolvingSyllogisms.csv'
+
+
+def image_folder(participant_id, trial_type):
+    """
+    Return the image folder shown to a participant in a trial. Even
+    participants start with Folder1, odd participants with Folder2.
+    """
+
+    if ((participant_id % 2) == 0 and trial_type == 'Pre') or \
+            ((participant_id % 2) == 1 and trial_type == 'Post'):
+        return 'Folder1'
+    return 'Folder2'
+
+
+def read_sessions(filename=RESULTS_FILE):
+    """
+    Read all sessions from the results file. The first row of a participant
+    is their Pre trial, the second row their Post trial. Rates are None if
+    no conclusion of their label was shown. Sessions aborted before the last
+    conclusion are not completed. The ability is None unless conclusions
+    were selected adaptively.
+    :param filename: str | path to results file
+    :return: dict {participant ID: list of session dicts}
+    """
+
+    sessions = {}
+    if not os.path.isfile(filename):
+        return sessions
+
+    with open(filename) as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not row:
+                continue
+
+            participant_id = int(row[0])
+            participant_sessions = sessions.setdefault(participant_id, [])
+            trial_type = 'Pre' if not participant_sessions else 'Post'
+
+            responses = ast.literal_eval(row[9])
+
+            # Sessions without stimulus IDs showed all conclusions in order
+            if len(row) > 10:
+                stimulus_ids = ast.literal_eval(row[10])
+            else:
+                stimulus_ids = list(range(len(responses)))
+
+            # Reaction time of each trial, missing in older sessions
+            reaction_times = ast.literal_eval(row[11]) if len(row) > 11 \
+                else []
+
+            # Selection of conclusions, older sessions showed all in order
+            mode = row[12] if len(row) > 12 else 'Fixed'
+
+            # Aborted sessions, older sessions are taken as completed
+            completed = row[13] == 'True' if len(row) > 13 else True
+
+            # Ability estimate and standard error of adaptive sessions
+            ability = float(row[14]) if len(row) > 14 and row[14] else None
+            ability_error = float(row[15]) if len(row) > 15 and row[15] \
+                else None
+
+            participant_sessions.append({
+                'trial_type': trial_type,
+                'folder': image_folder(participant_id, trial_type),
+                'mode': mode,
+                'completed': completed,
+                'ability': ability,
+                'ability_error': ability_error,
+                'hit_rate': float(row[1]) if row[1] else None,
+                'false_alarm_rate': float(row[2]) if row[2] else None,
+                'true_positives': float(row[3]),
+                'false_negatives': float(row[4]),
+                'false_positives': float(row[5]),
+                'true_negatives': float(row[6]),
+                'mean_reaction_time': float(row[7]),
+                'std_reaction_time': float(row[8]),
+                'responses': responses,
+                'stimulus_ids': stimulus_ids,
+                'reaction_times': reaction_times})
+
+    return sessions
+
+
+def item_difficulties(sessions, folder, labels):
+    """
+    Estimate the difficulty of each conclusion of an image folder as the log
+    odds of an incorrect answer over all sessions, with one correct and one
+    incorrect answer added to every item.
+    :param sessions: dict {participant ID: list of session dicts}
+    :param folder: str | image folder
+    :param labels: list of bool | label of each conclusion
+    :return: list of float | difficulty of each conclusion
+    """
+
+    presented = [0] * len(labels)
+    correct = [0] * len(labels)
+    for participant_sessions in sessions.values():
+        for session in participant_sessions:
+            if session['folder'] != folder:
+                continue
+            for stimulus_id, response in zip(session['stimulus_ids'],
+                                             session['responses']):
+                if stimulus_id < len(labels):
+                    presented[stimulus_id] += 1
+                    correct[stimulus_id] += response == labels[stimulus_id]
+
+    return [log((n - c + 1.0) / (c + 1.0)) for n, c in zip(presented,
+                                                            correct)]
@@ -0,0 +1,317 @@
+"""
+Validity checks of syllogisms.
+
+The items of the experiment are orderings: each premise shows two shapes in
+order, and a conclusion is true if the premises imply the order of its
+shapes. Shapes that appear in no premise (the bars) are placeholders. The
+premises are precomputed as the bitmask of all shapes that have to follow
+each shape, so a conclusion is checked with one bitmask test per shape.
+
+Categorical syllogisms (All/No/Some X are (not) Y) are checked as well. The
+three terms S, M and P split the universe into 8 regions. A model is the set
+of non-empty regions, so there are 256 models, and every statement is
+precomputed as the bitmask of the models in which it holds. A conclusion is
+valid if it holds in every model of its premises.
+
+Usage: python syllogism_logic.py [image folder]
+       python syllogism_logic.py [existential]
+"""
+
+import itertools
+import os
+import re
+import sys
+
+TERMS = ['S', 'M', 'P']
+QUANTIFIERS = ['A', 'E', 'I', 'O']
+
+# Premise terms (subject, predicate) of the four figures
+FIGURES = {1: [('M', 'P'), ('S', 'M')],
+           2: [('P', 'M'), ('S', 'M')],
+           3: [('M', 'P'), ('M', 'S')],
+           4: [('P', 'M'), ('M', 'S')]}
+
+NUMBER_OF_REGIONS = 2 ** len(TERMS)
+NUMBER_OF_MODELS = 2 ** NUMBER_OF_REGIONS
+ALL_MODELS = (1 << NUMBER_OF_MODELS) - 1
+
+STATEMENT_PATTERN = re.compile(r'^(all|no|some)\s+(.+?)\s+are\s+(not\s+)?'
+                               r'(.+?)\.?$', re.IGNORECASE)
+
+
+def _in_term(region, term):
+    return bool(region & (1 << TERMS.index(term)))
+
+
+def _models_where(condition):
+    """
+    Return bitmask of all models for which condition(model) holds.
+    """
+
+    mask = 0
+    for model in range(NUMBER_OF_MODELS):
+        if condition(model):
+            mask |= 1 << model
+    return mask
+
+
+def _non_empty_regions(model):
+    return [region for region in range(NUMBER_OF_REGIONS)
+            if model & (1 << region)]
+
+
+def _holds(quantifier, subject, predicate, model):
+    """
+    Check whether a statement holds in a model.
+    """
+
+    # Non-empty regions of the subject inside and outside the predicate
+    inside = [region for region in _non_empty_regions(model)
+              if _in_term(region, subject) and _in_term(region, predicate)]
+    outside = [region for region in _non_empty_regions(model)
+               if _in_term(region, subject) and
+               not _in_term(region, predicate)]
+
+    if quantifier == 'A':
+        return not outside
+    elif quantifier == 'E':
+        return not inside
+    elif quantifier == 'I':
+        return bool(inside)
+    return bool(outside)
+
+
+# Models of every statement (quantifier, subject, predicate)
+STATEMENTS = {(quantifier, subject, predicate):
+              _models_where(lambda model: _holds(quantifier, subject,
+                                                 predicate, model))
+              for quantifier in QUANTIFIERS
+              for subject in TERMS for predicate in TERMS
+              if subject != predicate}
+
+# Models in which no term is empty
+EXISTENTIAL_MODELS = _models_where(
+    lambda model: all(any(_in_term(region, term)
+                          for region in _non_empty_regions(model))
+                      for term in TERMS))
+
+
+def is_valid(premises, conclusion, existential_import=False):
+    """
+    Check whether conclusion follows from premises.
+    :param premises: list of statements (quantifier, subject, predicate)
+    :param conclusion: statement (quantifier, subject, predicate)
+    :param existential_import: bool | assume that no term is empty
+    :return: bool
+    """
+
+    models = EXISTENTIAL_MODELS if existential_import else ALL_MODELS
+    for premise in premises:
+        models &= STATEMENTS[premise]
+
+    return models & ~STATEMENTS[conclusion] == 0
+
+
+def syllogism(mood, figure):
+    """
+    Return premises and conclusion of a syllogism.
+    :param mood: str | quantifiers of both premises and conclusion, e.g. 'AAA'
+    :param figure: int | figure between 1 and 4
+    :return: tuple (list of premises, conclusion)
+    """
+
+    premises = [(quantifier, subject, predicate) for quantifier,
+                (subject, predicate) in zip(mood[:2], FIGURES[figure])]
+    return premises, (mood[2], 'S', 'P')
+
+
+def all_syllogisms(existential_import=False):
+    """
+    Return all 256 mood and figure combinations with their validity.
+    :return: list of tuples (mood, figure, bool)
+    """
+
+    items = []
+    for quantifiers in itertools.product(QUANTIFIERS, repeat=3):
+        mood = ''.join(quantifiers)
+        for figure in sorted(FIGURES):
+            premises, conclusion = syllogism(mood, figure)
+            items.append((mood, figure, is_valid(premises, conclusion,
+                                                 existential_import)))
+    return items
+
+
+def parse_statement(text):
+    """
+    Parse statement of the form 'All/No/Some X are (not) Y'.
+    :return: tuple (quantifier, subject, predicate)
+    """
+
+    match = STATEMENT_PATTERN.match(text.strip())
+    if match is None:
+        raise ValueError('Unknown statement: ' + text)
+
+    word, subject, negation, predicate = match.groups()
+    word = word.lower()
+    if word == 'all' and not negation:
+        quantifier = 'A'
+    elif word == 'no' and not negation:
+        quantifier = 'E'
+    elif word == 'some':
+        quantifier = 'O' if negation else 'I'
+    else:
+        raise ValueError('Unknown statement: ' + text)
+
+    return quantifier, subject.lower(), predicate.lower()
+
+
+def follows(premises, conclusion, existential_import=False):
+    """
+    Check whether a conclusion follows from a set of statements about
+    arbitrary terms. Each other term is tried as the middle term.
+    :param premises: list of parsed statements
+    :param conclusion: parsed statement
+    :param existential_import: bool | assume that no term is empty
+    :return: bool
+    """
+
+    _, subject, predicate = conclusion
+    if subject == predicate:
+        raise ValueError('Subject and predicate of the conclusion are '
+                         'the same term: ' + subject)
+
+    middle_terms = {term for _, s, p in premises for term in (s, p)} - \
+        {subject, predicate}
+
+    for middle in middle_terms or [None]:
+        names = {subject: 'S', middle: 'M', predicate: 'P'}
+        statements = [(q, names[s], names[p]) for q, s, p in premises
+                      if s in names and p in names]
+        if is_valid(statements, (conclusion[0], 'S', 'P'),
+                    existential_import):
+            return True
+
+    return False
+
+
+def read_definitions(filename):
+    """
+    Read text definition file with lines of the form 'name: text'.
+    :return: list of tuples (name, text)
+    """
+
+    definitions = []
+    with open(filename) as f:
+        for line in f:
+            name, _, text = line.partition(':')
+            if text.strip():
+                definitions.append((name.strip(), text.strip()))
+    return sorted(definitions)
+
+
+def parse_shapes(definition):
+    """
+    Return the shape names of an item definition, e.g.
+    'red-square! blue-circle | Caption' gives ['red-square', 'blue-circle'].
+    """
+
+    return [token.rstrip('!') for token in definition.split('|')[0].split()]
+
+
+def ordering_closure(premises):
+    """
+    Precompute the order implied by the premises.
+    :param premises: list of lists of shape names, each in correct order
+    :return: tuple (dict {shape: bit}, dict {shape: bitmask of all shapes
+             that have to follow it})
+    """
+
+    bits = {}
+    for premise in premises:
+        for shape in premise:
+            bits.setdefault(shape, 1 << len(bits))
+
+    # Direct successors of each shape
+    following = {shape: 0 for shape in bits}
+    for premise in premises:
+        for earlier, later in zip(premise, premise[1:]):
+            following[earlier] |= bits[later]
+
+    # Transitive closure
+    changed = True
+    while changed:
+        changed = False
+        for shape in following:
+            mask = following[shape]
+            for other, bit in bits.items():
+                if mask & bit:
+                    mask |= following[other]
+            if mask != following[shape]:
+                following[shape] = mask
+                changed = True
+
+    return bits, following
+
+
+def ordering_valid(closure, conclusion):
+    """
+    Check whether the premises imply the order of the shapes of a
+    conclusion. Every shape has to be followed by all later shapes of the
+    conclusion, so shapes the premises do not order relative to each other
+    make it invalid. Shapes that appear in no premise are ignored.
+    :param closure: result of ordering_closure
+    :param conclusion: list of shape names
+    :return: bool
+    """
+
+    bits, following = closure
+    shapes = [shape for shape in conclusion if shape in bits]
+
+    # Bitmask of the shapes placed after each shape of the conclusion
+    later = 0
+    for shape in reversed(shapes):
+        if later & ~following[shape]:
+            return False
+        later |= bits[shape]
+
+    return True
+
+
+def check_labels(folder):
+    """
+    Check the labels of all conclusions of an image folder against its
+    premises.
+    :param folder: str | folder with Premises.txt and Conclusions.txt
+    :return: list of names of mislabeled conclusions
+    """
+
+    closure = ordering_closure(
+        [parse_shapes(text) for _, text in
+         read_definitions(os.path.join(folder, 'Premises.txt'))])
+
+    mislabeled = []
+    for name, text in read_definitions(os.path.join(folder,
+                                                    'Conclusions.txt')):
+        label = name[2] == 'T'
+        if ordering_valid(closure, parse_shapes(text)) != label:
+            mislabeled.append(name)
+
+    return mislabeled
+
+
+if __name__ == '__main__':
+    existential_import = 'existential' in sys.argv[1:]
+    folders = [argument for argument in sys.argv[1:]
+               if argument != 'existential']
+
+    if folders:
+        mislabeled = check_labels(folders[0])
+        for name in mislabeled:
+            print('Label of conclusion ' + name + ' in ' + folders[0] +
+                  ' does not match its premises.')
+        print(str(len(mislabeled)) + ' mislabeled conclusions found.')
+    else:
+        # List all valid categorical syllogisms
+        for mood, figure, valid in all_syllogisms(existential_import):
+            if valid:
+                print(mood + '-' + str(figure))